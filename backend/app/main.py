@@ -11,11 +11,7 @@ def home():
     return "Backend is running!"
 
 if __name__ == '__main__':
-    # Make sure UPLOADS_DIR and GENERATED_GIFS_DIR are created when app starts
-    # This is already handled by ensure_directories_exist() in nft_routes and gif_service
-    # which are called upon import or first request depending on implementation.
-    # To be absolutely sure, we can call it here as well, though it might be redundant.
-    # from backend.app.services.gif_service import ensure_directories_exist as ensure_gif_dirs_exist
-    # ensure_gif_dirs_exist()
-    
+    # UPLOADS_DIR and GENERATED_GIFS_DIR are created when nft_bp is registered above
+    # (see init_storage in nft_routes). For a pre-forked server that imports the
+    # imaging stack once up front, run `python -m app.warm_fork` instead.
     app.run(debug=True, host='0.0.0.0', port=5000) # Added host and port for clarity
@@ -0,0 +1,226 @@
+# Bulk re-render: bring existing GIFs in line with the current render config.
+#
+# Every GIF in generated_gifs/ has a JSON sidecar in render_meta/ (written by create_gif_from_image)
+# recording the prices, sentiment band and render parameters it was rendered with.
+# This tool re-evaluates each item against the current render_config.json and
+# re-renders, across a process pool, only the items whose sentiment band (or
+# tile_size/padding) changed. Items keep their original prices, duration, fps and
+# scale. Finished items are appended to a checkpoint file so an interrupted run can
+# be resumed with --resume. The checkpoint's first line is a hash of the config it
+# was written for; if the config has changed since, --resume starts over.
+#
+# GIFs without a sidecar (minted before sidecars existed) have no recorded prices,
+# so their original band is unknown. They are skipped and counted as no_metadata
+# unless --include-legacy is given, which re-renders them at the current prices.
+#
+# Usage (from backend/):  python -m app.rerender --workers 4 [--resume] [--dry-run] [--include-legacy]
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.services.gif_service import (
+    create_gif_from_image, get_sentiment_band, render_metadata_path,
+    ensure_directories_exist, UPLOADS_DIR, GENERATED_GIFS_DIR, RENDER_META_DIR
+)
+from app.services.price_service import get_current_mock_prices
+from app.services.render_config import get_render_config
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+DEFAULT_CHECKPOINT_PATH = os.path.join(RENDER_META_DIR, 'rerender_checkpoint')
+
+
+def collect_items(uploads_dir=UPLOADS_DIR, gifs_dir=GENERATED_GIFS_DIR):
+    """Returns (stem, image_path) for every uploaded image that has a generated GIF."""
+    items = []
+    for name in sorted(os.listdir(uploads_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXTENSIONS and os.path.exists(os.path.join(gifs_dir, f"{stem}.gif")):
+            items.append((stem, os.path.join(uploads_dir, name)))
+    return items
+
+
+def read_render_metadata(stem):
+    """
+    Returns the item's sidecar dict, or None if it is missing, unreadable or the
+    wrong shape (no dict of numeric 'prices'), in which case its band is unknown.
+    """
+    path = render_metadata_path(stem)
+    try:
+        with open(path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable render metadata {path}: {e}")
+        return None
+    prices = meta.get('prices') if isinstance(meta, dict) else None
+    if not (isinstance(prices, dict)
+            and all(isinstance(prices.get(key), (int, float)) for key in ('btc_usd', 'sol_usd'))):
+        print(f"Ignoring malformed render metadata {path}")
+        return None
+    return meta
+
+
+def plan_rerender(items, config, include_legacy=False):
+    """
+    Splits items into (tasks, unchanged, no_metadata). A task is the argument tuple
+    for _rerender_item. Items without metadata are only re-rendered, at the current
+    prices, when include_legacy is set; otherwise they are returned in no_metadata.
+    """
+    tasks = []
+    unchanged = []
+    no_metadata = []
+    for stem, image_path in items:
+        meta = read_render_metadata(stem)
+        if meta is None:
+            if include_legacy:
+                tasks.append((stem, image_path, get_current_mock_prices(), 5, config['fps'], 1.0, config))
+            else:
+                no_metadata.append(stem)
+            continue
+        new_band = list(get_sentiment_band(meta['prices'], config))
+        if (new_band == meta.get('band')
+                and meta.get('tile_size') == config['tile_size']
+                and meta.get('padding') == config['padding']):
+            unchanged.append(stem)
+            continue
+        tasks.append((stem, image_path, meta['prices'], meta.get('duration_seconds', 5),
+                      meta.get('fps', config['fps']), meta.get('scale', 1.0), config))
+    return tasks, unchanged, no_metadata
+
+
+def _rerender_item(task):
+    """Process-pool worker. Returns (stem, succeeded, frames, seconds)."""
+    stem, image_path, prices, duration_seconds, fps, scale, config = task
+    started = time.perf_counter()
+    output_path = create_gif_from_image(image_path, stem, duration_seconds=duration_seconds, fps=fps,
+                                        scale=scale, prices=prices, config=config)
+    return stem, output_path is not None, duration_seconds * fps, time.perf_counter() - started
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def read_checkpoint(path):
+    """Returns (config_hash, finished_stems); config_hash is None if there is no checkpoint."""
+    if not os.path.exists(path):
+        return None, set()
+    with open(path) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if not lines or not lines[0].startswith('config '):
+        return None, set()
+    return lines[0][len('config '):], set(lines[1:])
+
+
+def rerender_collection(items, config, workers=None, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                        resume=False, dry_run=False, include_legacy=False):
+    """
+    Re-renders the items whose band changed under `config`. Returns a report dict
+    with counts, elapsed time and throughput.
+    """
+    started = time.perf_counter()
+    current_hash = config_hash(config)
+    done = set()
+    restarted = False
+    if resume:
+        checkpoint_hash, done = read_checkpoint(checkpoint_path)
+        if checkpoint_hash != current_hash:
+            # Items in the checkpoint were checked against a different config, so
+            # their band may have changed since: start over instead of skipping them.
+            restarted = checkpoint_hash is not None
+            resume = False
+            done = set()
+    pending = [item for item in items if item[0] not in done]
+    tasks, unchanged, no_metadata = plan_rerender(pending, config, include_legacy)
+
+    report = {
+        'total': len(items),
+        'resumed': len(items) - len(pending),
+        'unchanged': len(unchanged),
+        'no_metadata': len(no_metadata),
+        'to_render': len(tasks),
+        'rendered': 0,
+        'failed': [],
+        'frames': 0,
+        'restarted': restarted,
+    }
+
+    if not dry_run:
+        mode = 'a' if resume else 'w'
+        with open(checkpoint_path, mode) as checkpoint:
+            if not resume:
+                checkpoint.write(f"config {current_hash}\n")
+            # Unchanged items are done too; record them so a resume doesn't re-check them
+            for stem in unchanged:
+                checkpoint.write(stem + '\n')
+            checkpoint.flush()
+
+            if tasks:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {pool.submit(_rerender_item, task): task[0] for task in tasks}
+                    for future in as_completed(futures):
+                        try:
+                            stem, succeeded, frames, _ = future.result()
+                        except Exception as e:
+                            # Worker crash (BrokenProcessPool), pickling or render error:
+                            # record the item as failed and keep going so the report survives
+                            stem, succeeded, frames = futures[future], False, 0
+                            print(f"Error re-rendering {stem}: {e!r}")
+                        if succeeded:
+                            report['rendered'] += 1
+                            report['frames'] += frames
+                            checkpoint.write(stem + '\n')
+                            checkpoint.flush()
+                        else:
+                            report['failed'].append(stem)
+
+        if not report['failed'] and os.path.exists(checkpoint_path):
+            # Completed cleanly: the next run should start from scratch
+            os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = elapsed
+    report['items_per_second'] = report['rendered'] / elapsed if elapsed > 0 else 0.0
+    report['frames_per_second'] = report['frames'] / elapsed if elapsed > 0 else 0.0
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-render GIFs whose sentiment band changed.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint file path")
+    parser.add_argument('--resume', action='store_true', help="Skip items finished by a previous run")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be re-rendered")
+    parser.add_argument('--include-legacy', action='store_true',
+                        help="Re-render GIFs without render metadata at the current prices")
+    args = parser.parse_args(argv)
+
+    ensure_directories_exist()
+    config = get_render_config()
+    report = rerender_collection(collect_items(), config, workers=args.workers,
+                                 checkpoint_path=args.checkpoint, resume=args.resume,
+                                 dry_run=args.dry_run, include_legacy=args.include_legacy)
+
+    if report['restarted']:
+        print("Render config changed since the checkpoint was written; starting over.")
+    print(f"Items: {report['total']} (resumed past {report['resumed']}, unchanged {report['unchanged']}, "
+          f"to re-render {report['to_render']})")
+    if report['no_metadata']:
+        print(f"Skipped {report['no_metadata']} items without render metadata (original band unknown); "
+              "use --include-legacy to re-render them at the current prices.")
+    print(f"Rendered: {report['rendered']}, failed: {len(report['failed'])}")
+    print(f"Elapsed: {report['elapsed_seconds']:.2f}s, {report['items_per_second']:.2f} items/s, "
+          f"{report['frames_per_second']:.1f} frames/s")
+    if report['failed']:
+        print(f"Failed items: {', '.join(report['failed'])}. Re-run with --resume to retry them.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,14 +5,24 @@ from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 from app.services.gif_service import create_gif_from_image, UPLOADS_DIR, GENERATED_GIFS_DIR, ensure_directories_exist
 from app.services.price_service import get_current_mock_prices
-
-# Ensure upload and generated_gifs directories exist when this module is loaded
-# This is called in gif_service.create_gif_from_image and its test fixture,
-# but also good to have it here if routes are imported before a service call in some scenarios.
-ensure_directories_exist()
+from app.services.render_scheduler import render_scheduler, RenderRejected
+from app.services.nft_stats import marketplace_stats
 
 nft_bp = Blueprint('nft_bp', __name__, url_prefix='/api/nft')
 
+@nft_bp.record_once
+def init_storage(state):
+    """
+    Creates the upload and generated_gifs directories when the blueprint is
+    registered on an app, rather than as a side effect of importing this module.
+    """
+    ensure_directories_exist()
+
+@nft_bp.record_once
+def init_stats(state):
+    """Rebuilds the marketplace statistics from the NFT store when the app starts."""
+    marketplace_stats.rebuild(simulated_nft_db)
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 simulated_nft_db = [] # In-memory "database" for minted NFTs
 
@@ -44,8 +54,18 @@ def mint_nft_route():
             return jsonify({"error": f"Failed to save uploaded file: {str(e)}"}), 500
 
         output_filename_no_ext = os.path.splitext(filename)[0]
+        # Render budgets are per remote address; never trust a client-supplied id here
+        client_id = request.remote_addr
         # Using absolute paths for gif_service and then creating relative ones for response
-        absolute_gif_path = create_gif_from_image(uploaded_image_path, output_filename_no_ext)
+        try:
+            absolute_gif_path, render_plan = render_scheduler.run(client_id, uploaded_image_path, output_filename_no_ext)
+        except RenderRejected as e:
+            if os.path.exists(uploaded_image_path):
+                os.remove(uploaded_image_path)
+            response = jsonify({"error": e.message})
+            if e.retry_after is not None:
+                response.headers['Retry-After'] = str(e.retry_after)
+            return response, e.status_code
         
         if absolute_gif_path:
             prices = get_current_mock_prices()
@@ -64,8 +84,13 @@ def mint_nft_route():
                 'minting_price_sol': prices['sol_usd']
             }
             simulated_nft_db.append(nft_data)
-            
-            return jsonify(nft_data), 201
+            marketplace_stats.record_mint(nft_data)
+
+            response = jsonify(nft_data)
+            if render_plan.degraded:
+                # Let the client know the GIF was rendered at reduced quality
+                response.headers['X-Render-Degraded'] = f"fps={render_plan.fps};scale={render_plan.scale}"
+            return response, 201
         else:
             if os.path.exists(uploaded_image_path):
                 os.remove(uploaded_image_path)
@@ -73,6 +98,21 @@ def mint_nft_route():
     else:
         return jsonify({"error": "File type not allowed"}), 400
 
+@nft_bp.route('/scheduler', methods=['GET'])
+def get_scheduler_state():
+    """
+    Returns the render scheduler state (queue, budgets, counters) for monitoring.
+    """
+    return jsonify(render_scheduler.snapshot()), 200
+
+@nft_bp.route('/stats', methods=['GET'])
+def get_marketplace_stats():
+    """
+    Returns counts and average minting prices per nft_type, plus hourly and daily
+    mint volume. Maintained incrementally, so this doesn't scan the NFT store.
+    """
+    return jsonify(marketplace_stats.snapshot()), 200
+
 # Serve generated_gifs and uploads for the frontend to display
 @nft_bp.route('/generated_gifs/<path:filename>', methods=['GET'])
 def get_generated_gif(filename):
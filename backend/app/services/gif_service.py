@@ -1,27 +1,63 @@
 import os
-from PIL import Image, ImageDraw, ImageFont # Added ImageFont
-import imageio
+import json
 import secrets
 from app.services.price_service import get_current_mock_prices # Import price service
+from app.services.render_config import get_render_config
 
 # Define directories at the module level for clarity
 # BASE_DIR should resolve to /app/backend
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) # Changed from '..' , '..'
 UPLOADS_DIR = os.path.join(BASE_DIR, 'uploads')
 GENERATED_GIFS_DIR = os.path.join(BASE_DIR, 'generated_gifs')
-
-# Price Thresholds
-BTC_HIGH_THRESHOLD = 36000
-BTC_LOW_THRESHOLD = 34000
-SOL_HIGH_THRESHOLD = 130
-SOL_LOW_THRESHOLD = 110
+# Render metadata sidecars and re-render checkpoints. Kept out of GENERATED_GIFS_DIR,
+# which is served publicly by the NFT routes.
+RENDER_META_DIR = os.path.join(BASE_DIR, 'render_meta')
+
+# Price thresholds, tile_size, padding and fps come from render_config.json
+# (hot reloaded, see render_config.py).
+
+# Pillow and imageio (with its plugin discovery) are slow to import, so they are
+# imported on first render rather than at module load. See preload_imaging().
+
+def preload_imaging():
+    """
+    Imports the imaging stack and loads the font up front. Used by the warm-fork
+    server so workers inherit already-imported modules instead of paying on first mint.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    import imageio
+    import imageio.plugins.pillow
+    get_font(size=18)
+
+def get_sentiment_band(prices, config=None):
+    """Returns (btc_band, sol_band), each 'high', 'low' or 'neutral'."""
+    if config is None:
+        config = get_render_config()
+    btc_price = prices.get('btc_usd', 0)
+    sol_price = prices.get('sol_usd', 0)
+
+    def band(price, low, high):
+        if price > high:
+            return 'high'
+        if price < low:
+            return 'low'
+        return 'neutral'
+
+    return (band(btc_price, config['btc_low_threshold'], config['btc_high_threshold']),
+            band(sol_price, config['sol_low_threshold'], config['sol_high_threshold']))
+
+def render_metadata_path(output_filename_no_ext):
+    """Path of the JSON sidecar recording how a GIF was rendered (used by app.rerender)."""
+    return os.path.join(RENDER_META_DIR, f"{output_filename_no_ext}.json")
 
 def ensure_directories_exist():
     os.makedirs(UPLOADS_DIR, exist_ok=True)
     os.makedirs(GENERATED_GIFS_DIR, exist_ok=True)
+    os.makedirs(RENDER_META_DIR, exist_ok=True)
 
 def get_font(size=20):
     """Attempts to load a font, falling back to a default if specific paths fail."""
+    from PIL import ImageFont
     try:
         # Common path for DejaVu Sans on Linux systems
         return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
@@ -39,7 +75,21 @@ def get_font(size=20):
                 return ImageFont.load_default() # Final fallback
 
 
-def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5, fps=10):
+def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5, fps=None, scale=1.0,
+                          prices=None, config=None):
+    """
+    Renders the price-influenced GIF for an uploaded image. `fps` defaults to the
+    configured fps; `prices` default to the current prices (re-renders pass the
+    prices the NFT was minted at); `config` defaults to the current render config.
+    """
+    from PIL import Image, ImageDraw
+    import imageio
+
+    if config is None:
+        config = get_render_config()
+    if fps is None:
+        fps = config['fps']
+
     ensure_directories_exist()
     output_path = os.path.join(GENERATED_GIFS_DIR, f"{output_filename_no_ext}.gif")
 
@@ -49,9 +99,13 @@ def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5
             return None
 
         original_img = Image.open(image_path).convert("RGBA")
+        if scale != 1.0:
+            # Degraded render (see render_scheduler): shrink the image, keep the padding
+            scaled_size = (max(1, int(original_img.width * scale)), max(1, int(original_img.height * scale)))
+            original_img = original_img.resize(scaled_size)
         orig_w, orig_h = original_img.size
 
-        padding = 60 # Increased padding to make space for text
+        padding = config['padding']
         canvas_w = orig_w + 2 * padding
         canvas_h = orig_h + 2 * padding
         
@@ -59,18 +113,20 @@ def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5
         paste_y = (canvas_h - orig_h) // 2
 
         # Fetch prices and determine sentiment
-        prices = get_current_mock_prices()
+        if prices is None:
+            prices = get_current_mock_prices()
         btc_price = prices.get('btc_usd', 0)
         sol_price = prices.get('sol_usd', 0)
 
-        btc_is_high = btc_price > BTC_HIGH_THRESHOLD
-        btc_is_low = btc_price < BTC_LOW_THRESHOLD
-        sol_is_high = sol_price > SOL_HIGH_THRESHOLD
-        sol_is_low = sol_price < SOL_LOW_THRESHOLD
+        btc_band, sol_band = get_sentiment_band(prices, config)
+        btc_is_high = btc_band == 'high'
+        btc_is_low = btc_band == 'low'
+        sol_is_high = sol_band == 'high'
+        sol_is_low = sol_band == 'low'
 
         num_frames = duration_seconds * fps
         frames = []
-        tile_size = 20
+        tile_size = config['tile_size']
         font = get_font(size=18) # Load font once
 
         for i in range(num_frames):
@@ -119,8 +175,34 @@ def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5
             frames.append(frame_image)
 
         frame_duration = 1.0 / fps 
-        imageio.mimsave(output_path, frames, duration=frame_duration, loop=0)
-        
+
+        # Write to temp files next to the targets and rename them into place, so a served
+        # GIF is never half-written and an interrupted re-render keeps the previous one.
+        # GIF first, sidecar last: the sidecar never describes a GIF that isn't there yet.
+        metadata_path = render_metadata_path(output_filename_no_ext)
+        token = secrets.token_hex(8)
+        gif_tmp_path = os.path.join(GENERATED_GIFS_DIR, f".{output_filename_no_ext}.{token}.tmp.gif")
+        metadata_tmp_path = f"{metadata_path}.{token}.tmp"
+        try:
+            imageio.mimsave(gif_tmp_path, frames, duration=frame_duration, loop=0)
+            with open(metadata_tmp_path, 'w') as f:
+                json.dump({
+                    'source_image': os.path.basename(image_path),
+                    'prices': {'btc_usd': btc_price, 'sol_usd': sol_price},
+                    'band': [btc_band, sol_band],
+                    'duration_seconds': duration_seconds,
+                    'fps': fps,
+                    'scale': scale,
+                    'tile_size': tile_size,
+                    'padding': padding,
+                }, f)
+            os.replace(gif_tmp_path, output_path)
+            os.replace(metadata_tmp_path, metadata_path)
+        finally:
+            for tmp_path in (gif_tmp_path, metadata_tmp_path):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
         return output_path
     except FileNotFoundError:
         print(f"Error creating GIF: Input image not found at {image_path}")
@@ -130,17 +212,19 @@ def create_gif_from_image(image_path, output_filename_no_ext, duration_seconds=5
         return None
 
 if __name__ == '__main__':
+    from PIL import Image, ImageDraw
     ensure_directories_exist()
     dummy_image_path = os.path.join(UPLOADS_DIR, "test_image_prices.png")
     
     # --- Test with different price scenarios ---
     # To truly test, you'd mock get_current_mock_prices or temporarily change it.
     # For this example, we'll just run with the default mock prices.
-    # You can manually change thresholds above or prices in price_service.py for testing.
+    # You can change thresholds in render_config.json or prices in price_service.py for testing.
 
+    config = get_render_config()
     print(f"Current mock prices (from service): {get_current_mock_prices()}")
-    print(f"BTC High: {BTC_HIGH_THRESHOLD}, BTC Low: {BTC_LOW_THRESHOLD}")
-    print(f"SOL High: {SOL_HIGH_THRESHOLD}, SOL Low: {SOL_LOW_THRESHOLD}")
+    print(f"BTC High: {config['btc_high_threshold']}, BTC Low: {config['btc_low_threshold']}")
+    print(f"SOL High: {config['sol_high_threshold']}, SOL Low: {config['sol_low_threshold']}")
 
     try:
         img = Image.new('RGBA', (120, 90), color = (0, 0, 0, 0)) # Transparent base
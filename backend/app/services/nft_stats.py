@@ -0,0 +1,139 @@
+# Marketplace statistics, maintained incrementally as NFTs are minted.
+#
+# Counts and price sums per nft_type are kept in flat arrays, and mint volume over
+# time in fixed-size ring buffers of hourly and daily buckets. Recording a mint is
+# O(1) and a snapshot is O(number of buckets), independent of how many NFTs exist.
+from array import array
+from datetime import datetime, timezone
+import calendar
+import threading
+
+NFT_TYPES = ('short', 'long')
+_TYPE_INDEX = {nft_type: i for i, nft_type in enumerate(NFT_TYPES)}
+
+HOURLY_BUCKETS = 168 # One week of hourly buckets
+DAILY_BUCKETS = 90   # ~Three months of daily buckets
+
+
+def parse_timestamp(timestamp):
+    """Converts a creation_timestamp ('2024-01-01T12:00:00.123456Z') to epoch seconds."""
+    dt = datetime.fromisoformat(timestamp.rstrip('Z'))
+    return calendar.timegm(dt.timetuple())
+
+
+def _isoformat(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+class BucketRing:
+    """Counts per time bucket for the most recent `size` buckets of `bucket_seconds` each."""
+
+    def __init__(self, size, bucket_seconds):
+        self.size = size
+        self.bucket_seconds = bucket_seconds
+        self.counts = array('q', [0] * size)
+        self.bucket_ids = array('q', [-1] * size) # Which bucket each slot currently holds
+
+    def add(self, epoch_seconds):
+        bucket = int(epoch_seconds // self.bucket_seconds)
+        slot = bucket % self.size
+        if self.bucket_ids[slot] == bucket:
+            self.counts[slot] += 1
+        elif self.bucket_ids[slot] < bucket:
+            # Slot held an older bucket that has fallen out of the window
+            self.bucket_ids[slot] = bucket
+            self.counts[slot] = 1
+        # else: bucket is older than the window, nothing to record
+
+    def window(self, now_seconds):
+        """Returns (first_bucket_start_seconds, counts) for the window ending at now."""
+        last = int(now_seconds // self.bucket_seconds)
+        first = last - self.size + 1
+        counts = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.size
+            counts.append(self.counts[slot] if self.bucket_ids[slot] == bucket else 0)
+        return first * self.bucket_seconds, counts
+
+    def clear(self):
+        for slot in range(self.size):
+            self.counts[slot] = 0
+            self.bucket_ids[slot] = -1
+
+
+class MarketplaceStats:
+    def __init__(self, hourly_buckets=HOURLY_BUCKETS, daily_buckets=DAILY_BUCKETS):
+        self._lock = threading.Lock()
+        self.counts = array('q', [0] * len(NFT_TYPES))
+        self.btc_sums = array('d', [0.0] * len(NFT_TYPES))
+        self.sol_sums = array('d', [0.0] * len(NFT_TYPES))
+        self.hourly = BucketRing(hourly_buckets, 3600)
+        self.daily = BucketRing(daily_buckets, 86400)
+
+    def _record_locked(self, nft_type, minting_price_btc, minting_price_sol, epoch_seconds):
+        i = _TYPE_INDEX.get(nft_type)
+        if i is None:
+            return
+        self.counts[i] += 1
+        self.btc_sums[i] += minting_price_btc
+        self.sol_sums[i] += minting_price_sol
+        self.hourly.add(epoch_seconds)
+        self.daily.add(epoch_seconds)
+
+    def record_mint(self, nft_data):
+        """Adds one minted NFT (as stored in the NFT db) to the aggregates."""
+        epoch_seconds = parse_timestamp(nft_data['creation_timestamp'])
+        with self._lock:
+            self._record_locked(nft_data['nft_type'], nft_data['minting_price_btc'],
+                                nft_data['minting_price_sol'], epoch_seconds)
+
+    def rebuild(self, nfts):
+        """Recomputes all aggregates from the full NFT store, e.g. on startup."""
+        records = [(nft['nft_type'], nft['minting_price_btc'], nft['minting_price_sol'],
+                    parse_timestamp(nft['creation_timestamp'])) for nft in nfts]
+        with self._lock:
+            for i in range(len(NFT_TYPES)):
+                self.counts[i] = 0
+                self.btc_sums[i] = 0.0
+                self.sol_sums[i] = 0.0
+            self.hourly.clear()
+            self.daily.clear()
+            for record in records:
+                self._record_locked(*record)
+
+    def snapshot(self, now_seconds=None):
+        """Returns the aggregates as a JSON-serialisable dict."""
+        if now_seconds is None:
+            now_seconds = calendar.timegm(datetime.utcnow().timetuple())
+
+        def average(total, count):
+            return total / count if count else None
+
+        with self._lock:
+            by_type = {}
+            for nft_type, i in _TYPE_INDEX.items():
+                by_type[nft_type] = {
+                    'count': self.counts[i],
+                    'avg_minting_price_btc': average(self.btc_sums[i], self.counts[i]),
+                    'avg_minting_price_sol': average(self.sol_sums[i], self.counts[i]),
+                }
+            total = sum(self.counts)
+            mint_volume = {}
+            for name, ring in (('hourly', self.hourly), ('daily', self.daily)):
+                start, counts = ring.window(now_seconds)
+                mint_volume[name] = {
+                    'bucket_seconds': ring.bucket_seconds,
+                    'start': _isoformat(start),
+                    'counts': counts,
+                }
+            return {
+                'total': total,
+                'by_type': by_type,
+                'avg_minting_price_btc': average(sum(self.btc_sums), total),
+                'avg_minting_price_sol': average(sum(self.sol_sums), total),
+                'mint_volume': mint_volume,
+            }
+
+
+# Shared stats used by the NFT routes
+marketplace_stats = MarketplaceStats()
@@ -0,0 +1,112 @@
+# Render configuration: sentiment thresholds and render parameters.
+#
+# Values are read from a JSON file (render_config.json in backend/, or the path in
+# the RENDER_CONFIG_PATH environment variable) and reloaded automatically when the
+# file changes, so thresholds can be tuned without a redeploy. Missing keys fall
+# back to DEFAULT_RENDER_CONFIG; an invalid file is reported and ignored, keeping
+# the last good configuration.
+import json
+import os
+import threading
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, 'render_config.json')
+
+DEFAULT_RENDER_CONFIG = {
+    # Price thresholds for the sentiment bands
+    'btc_high_threshold': 36000,
+    'btc_low_threshold': 34000,
+    'sol_high_threshold': 130,
+    'sol_low_threshold': 110,
+    # Render parameters
+    'tile_size': 20,   # Background tile size in pixels
+    'padding': 60,     # Space around the image for the price text
+    'fps': 10,         # Default frame rate for new GIFs
+}
+
+RELOAD_CHECK_INTERVAL = 1.0 # Seconds between checks of the config file's mtime
+
+_lock = threading.Lock()
+_state = {
+    'path': None,
+    'mtime': None,
+    'checked_at': None,
+    'config': dict(DEFAULT_RENDER_CONFIG),
+}
+
+
+def get_config_path():
+    return os.environ.get('RENDER_CONFIG_PATH', DEFAULT_CONFIG_PATH)
+
+
+def validate_render_config(config):
+    """Raises ValueError if `config` is not a usable render configuration."""
+    unknown = set(config) - set(DEFAULT_RENDER_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown render config keys: {', '.join(sorted(unknown))}")
+    for key, value in config.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Render config '{key}' must be a number")
+    if config['btc_low_threshold'] >= config['btc_high_threshold']:
+        raise ValueError("btc_low_threshold must be below btc_high_threshold")
+    if config['sol_low_threshold'] >= config['sol_high_threshold']:
+        raise ValueError("sol_low_threshold must be below sol_high_threshold")
+    for key in ('tile_size', 'fps'):
+        if not isinstance(config[key], int) or config[key] <= 0:
+            raise ValueError(f"Render config '{key}' must be a positive integer")
+    if not isinstance(config['padding'], int) or config['padding'] < 0:
+        raise ValueError("Render config 'padding' must be a non-negative integer")
+
+
+def load_render_config(path):
+    """Reads and validates a render config file, filling in defaults for missing keys."""
+    with open(path) as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError("Render config must be a JSON object")
+    config = dict(DEFAULT_RENDER_CONFIG)
+    config.update(overrides)
+    validate_render_config(config)
+    return config
+
+
+def get_render_config():
+    """
+    Returns the current render config, reloading it if the file has changed.
+    The file is stat'ed at most once per RELOAD_CHECK_INTERVAL.
+    """
+    path = get_config_path()
+    now = time.monotonic()
+    with _lock:
+        if (path == _state['path'] and _state['checked_at'] is not None
+                and now - _state['checked_at'] < RELOAD_CHECK_INTERVAL):
+            return dict(_state['config'])
+        _state['checked_at'] = now
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if path != _state['path'] or mtime != _state['mtime']:
+            if mtime is None:
+                _state['config'] = dict(DEFAULT_RENDER_CONFIG)
+            else:
+                try:
+                    _state['config'] = load_render_config(path)
+                except (OSError, ValueError) as e:
+                    # Keep serving with the last good config rather than failing renders
+                    print(f"Error loading render config from {path}: {e}. Keeping previous config.")
+            _state['path'] = path
+            _state['mtime'] = mtime
+        return dict(_state['config'])
+
+
+def reset_render_config_cache():
+    """Forces the next get_render_config() call to re-read the file."""
+    with _lock:
+        _state['path'] = None
+        _state['mtime'] = None
+        _state['checked_at'] = None
+        _state['config'] = dict(DEFAULT_RENDER_CONFIG)
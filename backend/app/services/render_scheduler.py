@@ -0,0 +1,370 @@
+# Render scheduler: cost-based admission control and fair ordering for GIF renders.
+#
+# Render cost in create_gif_from_image grows with canvas pixels x frames, so a
+# single large upload can hold the renderer for a long time. The scheduler
+# estimates the cost from the image header before any work starts, charges it
+# against per-client and global token buckets, degrades (lower fps, smaller
+# image) requests that are too expensive, and dispatches queued renders in
+# weighted-fair-queuing order so small mints aren't stuck behind giant ones.
+import hashlib
+import heapq
+import itertools
+import math
+import secrets
+import threading
+import time
+
+from app.services.gif_service import create_gif_from_image
+from app.services.render_config import get_render_config
+
+# Costs are measured in "pixel-frames": canvas_w * canvas_h * number_of_frames.
+# A 512x512 upload at the default 5s / 10fps is roughly 20M pixel-frames.
+MAX_REQUEST_COST = 40_000_000     # Largest single render we accept before degrading
+CLIENT_BUCKET_CAPACITY = 120_000_000
+CLIENT_REFILL_PER_SECOND = 2_000_000
+GLOBAL_BUCKET_CAPACITY = 600_000_000
+GLOBAL_REFILL_PER_SECOND = 20_000_000
+MAX_CONCURRENT_RENDERS = 2
+MAX_QUEUE_DEPTH = 32
+MIN_FPS = 5                       # Degradation never goes below this frame rate
+MIN_SCALE = 0.25                  # ...or shrinks the image below this factor
+MAX_SNAPSHOT_CLIENTS = 50         # Client buckets listed in snapshot(), most depleted first
+
+
+class RenderRejected(Exception):
+    """Raised when a render request cannot be admitted."""
+
+    def __init__(self, message, status_code=429, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def estimate_render_cost(width, height, duration_seconds, fps, scale=1.0, padding=None):
+    """Returns the pixel-frame cost of rendering a width x height image."""
+    if padding is None:
+        padding = get_render_config()['padding']
+    canvas_w = int(width * scale) + 2 * padding
+    canvas_h = int(height * scale) + 2 * padding
+    return canvas_w * canvas_h * duration_seconds * fps
+
+
+def read_image_size(image_path):
+    """Reads (width, height) from the image header without decoding pixel data."""
+    from PIL import Image
+    with Image.open(image_path) as img:
+        return img.size
+
+
+class TokenBucket:
+    """Classic token bucket; tokens refill continuously up to capacity."""
+
+    def __init__(self, capacity, refill_per_second, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def available(self):
+        self._refill()
+        return self.tokens
+
+    def is_full(self):
+        return self.available() >= self.capacity
+
+    def seconds_until(self, amount):
+        """Seconds until `amount` tokens are available (0 if they already are)."""
+        deficit = amount - self.available()
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.refill_per_second
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RenderPlan:
+    """The admitted parameters for a render, possibly degraded from the request."""
+
+    def __init__(self, width, height, duration_seconds, fps, scale, requested_fps, requested_cost, padding):
+        self.width = width
+        self.height = height
+        self.duration_seconds = duration_seconds
+        self.fps = fps
+        self.scale = scale
+        self.requested_fps = requested_fps
+        self.requested_cost = requested_cost
+        self.cost = estimate_render_cost(width, height, duration_seconds, fps, scale, padding)
+
+    @property
+    def degraded(self):
+        return self.fps != self.requested_fps or self.scale != 1.0
+
+    def to_dict(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'duration_seconds': self.duration_seconds,
+            'fps': self.fps,
+            'scale': self.scale,
+            'cost': self.cost,
+            'requested_cost': self.requested_cost,
+            'degraded': self.degraded,
+        }
+
+
+class _Job:
+    def __init__(self, client_id, plan, start_tag, finish_tag):
+        self.client_id = client_id
+        self.plan = plan
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.ready = threading.Event()
+
+
+class RenderScheduler:
+    def __init__(self,
+                 max_request_cost=MAX_REQUEST_COST,
+                 client_capacity=CLIENT_BUCKET_CAPACITY,
+                 client_refill_per_second=CLIENT_REFILL_PER_SECOND,
+                 global_capacity=GLOBAL_BUCKET_CAPACITY,
+                 global_refill_per_second=GLOBAL_REFILL_PER_SECOND,
+                 max_concurrent=MAX_CONCURRENT_RENDERS,
+                 max_queue_depth=MAX_QUEUE_DEPTH,
+                 min_fps=MIN_FPS,
+                 min_scale=MIN_SCALE,
+                 clock=time.monotonic):
+        self.max_request_cost = max_request_cost
+        self.client_capacity = client_capacity
+        self.client_refill_per_second = client_refill_per_second
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.min_fps = min_fps
+        self.min_scale = min_scale
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._global_bucket = TokenBucket(global_capacity, global_refill_per_second, clock)
+        self._client_buckets = {}
+        self._weights = {}
+        self._last_finish = {}   # client_id -> finish tag of that client's latest job
+        self._queue = []         # heap of (finish_tag, seq, job)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._running = 0
+        self._stats = {'admitted': 0, 'degraded': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+        # Salt for client labels in snapshot(), so the public snapshot never exposes
+        # client ids (remote addresses) and the labels can't be reversed by hashing IPs
+        self._label_salt = secrets.token_bytes(16)
+
+    def set_weight(self, client_id, weight):
+        """Gives a client a larger (or smaller) share of render throughput."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            self._weights[client_id] = weight
+
+    def client_label(self, client_id):
+        """Opaque label for a client, stable for the lifetime of this scheduler."""
+        return hashlib.sha256(self._label_salt + str(client_id).encode()).hexdigest()[:12]
+
+    def _prune_client_buckets_locked(self):
+        # A full bucket behaves exactly like a new one, so dropping it loses nothing
+        # and keeps the dict limited to clients that have rendered recently.
+        for client_id in [cid for cid, bucket in self._client_buckets.items() if bucket.is_full()]:
+            del self._client_buckets[client_id]
+
+    def _client_bucket(self, client_id):
+        bucket = self._client_buckets.get(client_id)
+        if bucket is None:
+            self._prune_client_buckets_locked()
+            bucket = TokenBucket(self.client_capacity, self.client_refill_per_second, self.clock)
+            self._client_buckets[client_id] = bucket
+        return bucket
+
+    def plan(self, width, height, duration_seconds, fps):
+        """
+        Fits a request under max_request_cost by lowering fps first, then
+        shrinking the image. Raises RenderRejected if it still doesn't fit.
+        """
+        padding = get_render_config()['padding']
+        requested_cost = estimate_render_cost(width, height, duration_seconds, fps, padding=padding)
+        if requested_cost <= self.max_request_cost:
+            return RenderPlan(width, height, duration_seconds, fps, 1.0, fps, requested_cost, padding)
+
+        new_fps = fps
+        if fps > self.min_fps:
+            # Cost is linear in fps, so solve for the largest fps that fits.
+            per_frame_second = estimate_render_cost(width, height, duration_seconds, 1, padding=padding)
+            new_fps = max(self.min_fps, min(fps, self.max_request_cost // per_frame_second))
+
+        scale = 1.0
+        if estimate_render_cost(width, height, duration_seconds, new_fps, padding=padding) > self.max_request_cost:
+            # Padding doesn't scale, so binary search for the largest scale that fits.
+            lo, hi = self.min_scale, 1.0
+            if estimate_render_cost(width, height, duration_seconds, new_fps, lo, padding) > self.max_request_cost:
+                raise RenderRejected(
+                    f"Render too large: estimated cost {requested_cost} exceeds limit "
+                    f"{self.max_request_cost} even after degrading",
+                    status_code=413)
+            for _ in range(20):
+                mid = (lo + hi) / 2
+                if estimate_render_cost(width, height, duration_seconds, new_fps, mid, padding) <= self.max_request_cost:
+                    lo = mid
+                else:
+                    hi = mid
+            scale = math.floor(lo * 1000) / 1000
+
+        return RenderPlan(width, height, duration_seconds, new_fps, scale, fps, requested_cost, padding)
+
+    def admit(self, client_id, image_path, duration_seconds=5, fps=None):
+        """
+        Estimates the render cost from the image header and charges it against
+        the client and global budgets. Returns the (possibly degraded) RenderPlan.
+        """
+        if fps is None:
+            fps = get_render_config()['fps']
+        try:
+            width, height = read_image_size(image_path)
+        except Exception:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise RenderRejected("Uploaded file is not a readable image", status_code=400)
+
+        with self._lock:
+            try:
+                plan = self.plan(width, height, duration_seconds, fps)
+                client_bucket = self._client_bucket(client_id)
+                client_wait = client_bucket.seconds_until(plan.cost)
+                global_wait = self._global_bucket.seconds_until(plan.cost)
+                if client_wait > 0:
+                    raise RenderRejected("Client render budget exhausted",
+                                         retry_after=math.ceil(client_wait))
+                if global_wait > 0:
+                    raise RenderRejected("Server render budget exhausted",
+                                         retry_after=math.ceil(global_wait))
+            except RenderRejected:
+                self._stats['rejected'] += 1
+                raise
+
+            client_bucket.consume(plan.cost)
+            self._global_bucket.consume(plan.cost)
+            self._stats['admitted'] += 1
+            if plan.degraded:
+                self._stats['degraded'] += 1
+        return plan
+
+    def _refund_locked(self, client_id, cost):
+        bucket = self._client_buckets.get(client_id)
+        if bucket is not None: # A pruned bucket was already full
+            bucket.refund(cost)
+        self._global_bucket.refund(cost)
+
+    def _enqueue(self, client_id, plan):
+        """
+        Queues an admitted plan. The queue depth check happens under the same lock
+        as the push, so concurrent requests can't overfill the queue; a rejected
+        plan's cost is refunded.
+        """
+        with self._lock:
+            if len(self._queue) >= self.max_queue_depth:
+                self._refund_locked(client_id, plan.cost)
+                self._stats['admitted'] -= 1
+                if plan.degraded:
+                    self._stats['degraded'] -= 1
+                self._stats['rejected'] += 1
+                raise RenderRejected("Render queue is full, try again later", retry_after=1)
+            weight = self._weights.get(client_id, 1.0)
+            start_tag = max(self._virtual_time, self._last_finish.get(client_id, 0.0))
+            finish_tag = start_tag + plan.cost / weight
+            self._last_finish[client_id] = finish_tag
+            job = _Job(client_id, plan, start_tag, finish_tag)
+            heapq.heappush(self._queue, (finish_tag, next(self._seq), job))
+            self._dispatch_locked()
+        return job
+
+    def _dispatch_locked(self):
+        while self._running < self.max_concurrent and self._queue:
+            _, _, job = heapq.heappop(self._queue)
+            self._virtual_time = max(self._virtual_time, job.start_tag)
+            self._running += 1
+            job.ready.set()
+
+    def _complete(self, job, succeeded=True):
+        with self._lock:
+            self._running -= 1
+            if succeeded:
+                self._stats['completed'] += 1
+            else:
+                # No GIF came out of it, so don't charge the client for the attempt
+                self._refund_locked(job.client_id, job.plan.cost)
+                self._stats['failed'] += 1
+            if not self._queue and self._running == 0:
+                # Idle: nothing is backlogged, so old finish tags no longer matter.
+                self._last_finish.clear()
+            self._dispatch_locked()
+
+    def run(self, client_id, image_path, output_filename_no_ext, duration_seconds=5, fps=None):
+        """
+        Admits, queues and renders a GIF. Returns (output_path, plan); raises
+        RenderRejected if the request is over budget.
+        """
+        plan = self.admit(client_id, image_path, duration_seconds, fps)
+        job = self._enqueue(client_id, plan)
+        job.ready.wait()
+        output_path = None
+        try:
+            output_path = create_gif_from_image(image_path, output_filename_no_ext,
+                                                duration_seconds=plan.duration_seconds,
+                                                fps=plan.fps, scale=plan.scale)
+        finally:
+            self._complete(job, succeeded=output_path is not None)
+        return output_path, plan
+
+    def snapshot(self):
+        """
+        Returns the scheduler state as a JSON-serialisable dict for monitoring.
+        Only the MAX_SNAPSHOT_CLIENTS most depleted client buckets are listed, keyed
+        by client_label() rather than the raw client id.
+        """
+        with self._lock:
+            self._prune_client_buckets_locked()
+            most_depleted = sorted(self._client_buckets.items(),
+                                   key=lambda item: item[1].available())[:MAX_SNAPSHOT_CLIENTS]
+            return {
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_concurrent': self.max_concurrent,
+                'max_queue_depth': self.max_queue_depth,
+                'max_request_cost': self.max_request_cost,
+                'virtual_time': self._virtual_time,
+                'global_tokens': self._global_bucket.available(),
+                'global_capacity': self._global_bucket.capacity,
+                'client_count': len(self._client_buckets),
+                'clients': {
+                    self.client_label(client_id): {
+                        'tokens': bucket.available(),
+                        'capacity': bucket.capacity,
+                        'weight': self._weights.get(client_id, 1.0),
+                    }
+                    for client_id, bucket in most_depleted
+                },
+                'stats': dict(self._stats),
+            }
+
+
+# Shared scheduler used by the NFT routes
+render_scheduler = RenderScheduler()
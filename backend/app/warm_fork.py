@@ -0,0 +1,102 @@
+# Warm-fork server: import everything once in a parent process, then fork workers.
+#
+# gif_service defers Pillow/imageio until the first render so that plain imports
+# (tests, CLI tools, autoscaled workers) stay fast. In production that just moves
+# the cost onto the first mint each worker handles. This mode pays it once in the
+# parent, before forking, so every worker starts with the imaging stack already
+# imported and shares those pages copy-on-write.
+#
+# Every worker is a separate process with its own copy of all in-memory state:
+# the NFT store (simulated_nft_db), the marketplace stats and the render
+# scheduler. With more than one worker, /api/nft/all and /api/nft/stats only
+# show what the worker handling the request minted, and render budgets apply per
+# worker. Keep --workers at 1 (the default) until the NFT store is shared.
+#
+# Usage (from backend/):  python -m app.warm_fork --port 5000
+import argparse
+import os
+import signal
+import socket
+import sys
+
+
+def preload():
+    """Imports the app and the imaging stack. Returns the Flask app."""
+    from app.main import app
+    from app.services.gif_service import preload_imaging
+    preload_imaging()
+    return app
+
+
+def serve_worker(app, host, port, listen_socket):
+    from werkzeug.serving import make_server
+    # With fd= werkzeug adopts the parent's listening socket instead of binding again
+    server = make_server(host, port, app, threaded=True, fd=listen_socket.fileno())
+    server.serve_forever()
+
+
+def run(host='0.0.0.0', port=5000, workers=1):
+    app = preload()
+
+    if not hasattr(os, 'fork'):
+        # No fork() on this platform (e.g. Windows): serve from this process.
+        print("fork() not available, serving from a single preloaded process.")
+        app.run(host=host, port=port)
+        return
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(128)
+    listen_socket.set_inheritable(True)
+    port = listen_socket.getsockname()[1] # Resolves port 0 to the ephemeral port
+
+    if workers > 1:
+        print(f"Warning: {workers} workers each keep their own in-memory NFT store and stats; "
+              "minted NFTs are only visible on the worker that minted them.", flush=True)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                serve_worker(app, host, port, listen_socket)
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                exit_code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(exit_code)
+        children.append(pid)
+
+    print(f"Warm-fork server on {host}:{port} with {workers} workers: {children}", flush=True)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    listen_socket.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the backend from preloaded, forked workers.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes. More than 1 splits the in-memory NFT store between workers.")
+    args = parser.parse_args()
+    run(host=args.host, port=args.port, workers=args.workers)
+    sys.exit(0)
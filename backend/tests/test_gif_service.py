@@ -6,7 +6,7 @@ from unittest.mock import patch, MagicMock
 
 # Adjust the import path based on your project structure
 # This assumes backend/ is a top-level directory and your tests are run from the project root or backend/
-from app.services.gif_service import create_gif_from_image, UPLOADS_DIR, GENERATED_GIFS_DIR, ensure_directories_exist
+from app.services.gif_service import create_gif_from_image, UPLOADS_DIR, GENERATED_GIFS_DIR, RENDER_META_DIR, ensure_directories_exist
 from app.services import gif_service # To mock constants like BTC_HIGH_THRESHOLD
 
 # Define a fixture for a dummy image path
@@ -30,6 +30,10 @@ def dummy_image_path(tmp_path):
         for item in os.listdir(GENERATED_GIFS_DIR):
             if item.startswith("test_dummy") and item.endswith(".gif"):
                 os.remove(os.path.join(GENERATED_GIFS_DIR, item))
+    if os.path.exists(RENDER_META_DIR):
+        for item in os.listdir(RENDER_META_DIR):
+            if item.startswith("test_dummy") and item.endswith(".json"):
+                os.remove(os.path.join(RENDER_META_DIR, item))
 
 
 @pytest.fixture
@@ -101,6 +105,32 @@ def test_create_gif_outside_uploads_dir_fails(mock_get_prices, tmp_path):
     
     assert gif_path is None # Should fail because path is not in UPLOADS_DIR
 
+@patch('app.services.gif_service.get_current_mock_prices')
+def test_interrupted_render_keeps_previous_gif(mock_get_prices, dummy_image_path):
+    mock_get_prices.return_value = MOCK_PRICES_NEUTRAL
+    output_filename_no_ext = "test_dummy_atomic_gif"
+    gif_path = create_gif_from_image(dummy_image_path, output_filename_no_ext, duration_seconds=1, fps=2)
+    metadata_path = gif_service.render_metadata_path(output_filename_no_ext)
+    with open(gif_path, 'rb') as f:
+        original_gif = f.read()
+    with open(metadata_path) as f:
+        original_metadata = f.read()
+
+    def partial_write(path, frames, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'GIF89a truncated')
+        raise OSError("disk full")
+
+    with patch('imageio.mimsave', side_effect=partial_write):
+        assert create_gif_from_image(dummy_image_path, output_filename_no_ext, duration_seconds=1, fps=4) is None
+
+    with open(gif_path, 'rb') as f:
+        assert f.read() == original_gif
+    with open(metadata_path) as f:
+        assert f.read() == original_metadata
+    leftovers = [name for name in os.listdir(GENERATED_GIFS_DIR) + os.listdir(RENDER_META_DIR) if '.tmp' in name]
+    assert leftovers == []
+
 # Optional: Test for sentiment-influenced colors (more complex)
 # This would involve checking specific pixel colors in the generated GIF frames.
 # For brevity, this example will skip the direct pixel check, but here's a conceptual outline:
@@ -117,9 +147,11 @@ def test_ensure_directories_exist(tmp_path):
     
     test_uploads = tmp_path / "test_uploads"
     test_generated = tmp_path / "test_generated_gifs"
+    test_meta = tmp_path / "test_render_meta"
 
     with patch('app.services.gif_service.UPLOADS_DIR', str(test_uploads)), \
-         patch('app.services.gif_service.GENERATED_GIFS_DIR', str(test_generated)):
+         patch('app.services.gif_service.GENERATED_GIFS_DIR', str(test_generated)), \
+         patch('app.services.gif_service.RENDER_META_DIR', str(test_meta)):
         
         assert not os.path.exists(test_uploads)
         assert not os.path.exists(test_generated)
@@ -130,6 +162,23 @@ def test_ensure_directories_exist(tmp_path):
         assert os.path.isdir(test_uploads)
         assert os.path.exists(test_generated)
         assert os.path.isdir(test_generated)
+        assert os.path.isdir(test_meta)
+
+def test_preload_imaging_imports_heavy_modules():
+    # Run in a fresh interpreter: this test process has already imported PIL and imageio
+    import subprocess
+    import sys
+    code = (
+        "import sys\n"
+        "from app.services import gif_service\n"
+        "assert 'PIL.Image' not in sys.modules and 'imageio' not in sys.modules\n"
+        "gif_service.preload_imaging()\n"
+        "assert 'PIL.Image' in sys.modules and 'imageio' in sys.modules\n"
+    )
+    backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    result = subprocess.run([sys.executable, '-c', code], cwd=backend_dir,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
 
 # To run these tests:
 # 1. Ensure pytest is installed.
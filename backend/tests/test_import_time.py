@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+# Startup budget for the app's own share of `import app.routes.nft_routes`, in
+# microseconds: its cumulative `python -X importtime` figure minus Flask's, so the
+# budget doesn't scale with how fast the machine imports Flask. Measured at ~40ms
+# with lazy imaging imports versus ~150ms when Pillow/imageio load eagerly. The
+# imaging stack must also not be imported at all. Override with
+# IMPORT_TIME_BUDGET_US on slow CI machines.
+IMPORT_TIME_BUDGET_US = int(os.environ.get('IMPORT_TIME_BUDGET_US', 60_000))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY_MODULES = ('PIL', 'imageio', 'numpy')
+
+def run_python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+    )
+
+def parse_importtime(stderr):
+    """Returns {module_name: cumulative_us} from `-X importtime` output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # A module is only imported once; keep its first (real) entry
+        cumulative.setdefault(name.strip(), int(cumulative_us))
+    return cumulative
+
+def test_routes_import_within_budget():
+    # Best of three to keep scheduler noise out of the measurement
+    timings = []
+    for _ in range(3):
+        result = run_python('import app.routes.nft_routes', '-X', 'importtime')
+        assert result.returncode == 0, result.stderr
+        imported = parse_importtime(result.stderr)
+        timings.append(imported['app.routes.nft_routes'] - imported['flask'])
+    assert min(timings) <= IMPORT_TIME_BUDGET_US, \
+        f"Importing app.routes.nft_routes took {min(timings)}us on top of Flask, budget is {IMPORT_TIME_BUDGET_US}us"
+
+def test_routes_import_skips_imaging_stack():
+    result = run_python('import app.routes.nft_routes', '-X', 'importtime')
+    assert result.returncode == 0, result.stderr
+    imported = parse_importtime(result.stderr)
+    heavy = [name for name in imported if name.split('.')[0] in HEAVY_MODULES]
+    assert heavy == [], f"Heavy modules imported at startup: {heavy}"
+
+def test_routes_import_has_no_filesystem_side_effects():
+    code = (
+        "import os\n"
+        "def fail(*args, **kwargs): raise AssertionError('makedirs called at import time')\n"
+        "os.makedirs = fail\n"
+        "import app.routes.nft_routes\n"
+    )
+    result = run_python(code)
+    assert result.returncode == 0, result.stderr
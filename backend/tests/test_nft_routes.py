@@ -4,6 +4,9 @@ import json
 import pytest
 from app.main import app as flask_app # Import the Flask app instance
 from app.routes.nft_routes import simulated_nft_db, UPLOADS_DIR, GENERATED_GIFS_DIR
+from app.services.render_scheduler import RenderRejected
+from app.services.nft_stats import marketplace_stats
+from app.services.gif_service import render_metadata_path
 from unittest.mock import patch
 
 @pytest.fixture
@@ -15,6 +18,7 @@ def app():
     })
     # Clear the simulated_nft_db before each test
     simulated_nft_db.clear()
+    marketplace_stats.rebuild(simulated_nft_db)
     
     # Ensure upload and generated_gifs directories exist
     if not os.path.exists(UPLOADS_DIR):
@@ -95,6 +99,8 @@ def test_mint_nft_success(mock_get_prices, client):
         os.remove(os.path.join(GENERATED_GIFS_DIR, os.path.basename(response_json['gif_url'])))
     if os.path.exists(os.path.join(UPLOADS_DIR, os.path.basename(response_json['original_image_url']))):
         os.remove(os.path.join(UPLOADS_DIR, os.path.basename(response_json['original_image_url'])))
+    if os.path.exists(render_metadata_path('test_image')):
+        os.remove(render_metadata_path('test_image'))
 
 
 def test_mint_nft_missing_file(client):
@@ -147,6 +153,12 @@ def test_list_all_nfts(mock_get_prices, client):
     assert nfts_list[0]['id'] == minted_nft_data['id']
     assert nfts_list[0]['nft_type'] == 'short'
 
+    # Cleanup
+    for path in (os.path.join(GENERATED_GIFS_DIR, 'test_list.gif'), os.path.join(UPLOADS_DIR, 'test_list.png'),
+                 render_metadata_path('test_list')):
+        if os.path.exists(path):
+            os.remove(path)
+
 @patch('app.routes.nft_routes.get_current_mock_prices')
 def test_file_serving(mock_get_prices, client):
     mock_get_prices.return_value = MOCK_PRICES_FOR_TESTS
@@ -189,6 +201,93 @@ def test_file_serving(mock_get_prices, client):
         os.remove(os.path.join(GENERATED_GIFS_DIR, gif_filename))
     if os.path.exists(os.path.join(UPLOADS_DIR, original_filename)):
         os.remove(os.path.join(UPLOADS_DIR, original_filename))
+    if os.path.exists(render_metadata_path('serve_test')):
+        os.remove(render_metadata_path('serve_test'))
+
+def test_scheduler_state(client):
+    response = client.get('/api/nft/scheduler')
+    assert response.status_code == 200
+    state = response.get_json()
+    for key in ['running', 'queued', 'global_tokens', 'clients', 'stats']:
+        assert key in state
+
+@patch('app.routes.nft_routes.get_current_mock_prices')
+def test_scheduler_state_hides_client_addresses(mock_get_prices, client):
+    mock_get_prices.return_value = MOCK_PRICES_FOR_TESTS
+    img = Image.new('RGB', (2, 2), color='blue')
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+    client.post('/api/nft/mint', data={'file': (img_byte_arr, 'test_hidden_addr.png'), 'nft_type': 'long'},
+                content_type='multipart/form-data', environ_base={'REMOTE_ADDR': '10.1.2.3'})
+
+    response = client.get('/api/nft/scheduler')
+    assert b'10.1.2.3' not in response.data
+
+    for path in (os.path.join(GENERATED_GIFS_DIR, 'test_hidden_addr.gif'), os.path.join(UPLOADS_DIR, 'test_hidden_addr.png'),
+                 render_metadata_path('test_hidden_addr')):
+        if os.path.exists(path):
+            os.remove(path)
+
+@patch('app.routes.nft_routes.render_scheduler.run', side_effect=RenderRejected("Client render budget exhausted", retry_after=3))
+def test_mint_nft_rejected_by_scheduler(mock_run, client):
+    img = Image.new('RGB', (2, 2), color='blue')
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+
+    data = {'file': (img_byte_arr, 'test_rejected.png'), 'nft_type': 'long'}
+    response = client.post('/api/nft/mint', data=data, content_type='multipart/form-data')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+    assert 'budget exhausted' in response.get_json()['error']
+    assert len(simulated_nft_db) == 0
+    assert not os.path.exists(os.path.join(UPLOADS_DIR, 'test_rejected.png'))
+
+@patch('app.routes.nft_routes.get_current_mock_prices')
+def test_stats_updated_on_mint(mock_get_prices, client):
+    mock_get_prices.return_value = MOCK_PRICES_FOR_TESTS
+
+    response = client.get('/api/nft/stats')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 0
+
+    img = Image.new('RGB', (2, 2), color='blue')
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+    mint_response = client.post('/api/nft/mint', data={'file': (img_byte_arr, 'test_stats.png'), 'nft_type': 'short'},
+                                content_type='multipart/form-data')
+    assert mint_response.status_code == 201
+
+    stats = client.get('/api/nft/stats').get_json()
+    assert stats['total'] == 1
+    assert stats['by_type']['short']['count'] == 1
+    assert stats['by_type']['short']['avg_minting_price_btc'] == MOCK_PRICES_FOR_TESTS['btc_usd']
+    assert stats['by_type']['long']['count'] == 0
+    assert stats['by_type']['long']['avg_minting_price_sol'] is None
+    assert sum(stats['mint_volume']['hourly']['counts']) == 1
+    assert stats['mint_volume']['hourly']['counts'][-1] == 1
+
+    gif_filename = os.path.basename(mint_response.get_json()['gif_url'])
+    for path in (os.path.join(GENERATED_GIFS_DIR, gif_filename), os.path.join(UPLOADS_DIR, 'test_stats.png'),
+                 render_metadata_path('test_stats')):
+        if os.path.exists(path):
+            os.remove(path)
+
+@patch('app.routes.nft_routes.render_scheduler.run', return_value=(None, None))
+def test_mint_budget_keyed_on_remote_addr(mock_run, client):
+    img = Image.new('RGB', (2, 2), color='blue')
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+
+    data = {'file': (img_byte_arr, 'test_client_id.png'), 'nft_type': 'long'}
+    client.post('/api/nft/mint', data=data, content_type='multipart/form-data',
+                headers={'X-Client-Id': 'spoofed'}, environ_base={'REMOTE_ADDR': '10.0.0.7'})
+
+    assert mock_run.call_args[0][0] == '10.0.0.7'
 
 # Note: The test_mint_nft_success needs a valid image for create_gif_from_image to not fail.
 # The current `dummy_image_data` is just bytes, not a PNG.
@@ -237,6 +336,8 @@ def test_mint_nft_success_with_valid_image(mock_get_prices, client):
         os.remove(os.path.join(GENERATED_GIFS_DIR, gif_filename))
     if os.path.exists(os.path.join(UPLOADS_DIR, original_filename)):
         os.remove(os.path.join(UPLOADS_DIR, original_filename))
+    if os.path.exists(render_metadata_path('valid_test_image')):
+        os.remove(render_metadata_path('valid_test_image'))
 
 # Need to import Image from PIL for the valid image tests
 from PIL import Image
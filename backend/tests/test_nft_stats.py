@@ -0,0 +1,88 @@
+import calendar
+from datetime import datetime
+import pytest
+
+from app.services.nft_stats import MarketplaceStats, BucketRing, parse_timestamp
+
+NOW = calendar.timegm(datetime(2024, 3, 10, 12, 30).timetuple())
+
+def make_nft(nft_type, btc, sol, seconds_ago=0):
+    created = datetime.utcfromtimestamp(NOW - seconds_ago)
+    return {
+        'nft_type': nft_type,
+        'minting_price_btc': btc,
+        'minting_price_sol': sol,
+        'creation_timestamp': created.isoformat() + "Z",
+    }
+
+def test_parse_timestamp():
+    assert parse_timestamp("2024-03-10T12:30:00Z") == NOW
+    assert parse_timestamp("2024-03-10T12:30:00.654321Z") == NOW
+
+def test_counts_and_averages_per_type():
+    stats = MarketplaceStats()
+    stats.record_mint(make_nft('short', 30000, 100))
+    stats.record_mint(make_nft('short', 40000, 140))
+    stats.record_mint(make_nft('long', 35000, 120))
+
+    snapshot = stats.snapshot(NOW)
+    assert snapshot['total'] == 3
+    assert snapshot['by_type']['short'] == {
+        'count': 2, 'avg_minting_price_btc': 35000, 'avg_minting_price_sol': 120,
+    }
+    assert snapshot['by_type']['long']['count'] == 1
+    assert snapshot['avg_minting_price_btc'] == pytest.approx(35000)
+    assert snapshot['avg_minting_price_sol'] == pytest.approx(120)
+
+def test_empty_stats_have_no_averages():
+    snapshot = MarketplaceStats().snapshot(NOW)
+    assert snapshot['total'] == 0
+    assert snapshot['avg_minting_price_btc'] is None
+    assert snapshot['by_type']['long']['avg_minting_price_sol'] is None
+
+def test_mint_volume_histograms():
+    stats = MarketplaceStats(hourly_buckets=24, daily_buckets=7)
+    stats.record_mint(make_nft('short', 1, 1))
+    stats.record_mint(make_nft('short', 1, 1, seconds_ago=60))
+    stats.record_mint(make_nft('long', 1, 1, seconds_ago=3 * 3600))
+    stats.record_mint(make_nft('long', 1, 1, seconds_ago=2 * 86400))
+    stats.record_mint(make_nft('long', 1, 1, seconds_ago=30 * 86400)) # Outside both windows
+
+    volume = stats.snapshot(NOW)['mint_volume']
+    hourly = volume['hourly']['counts']
+    assert len(hourly) == 24
+    assert hourly[-1] == 2
+    assert hourly[-4] == 1
+    assert sum(hourly) == 3
+    assert volume['hourly']['start'] == "2024-03-09T13:00:00Z"
+
+    daily = volume['daily']['counts']
+    assert len(daily) == 7
+    assert daily[-1] == 3
+    assert daily[-3] == 1
+    assert sum(daily) == 4
+
+def test_bucket_ring_reuses_expired_slots():
+    ring = BucketRing(size=3, bucket_seconds=10)
+    ring.add(5)    # bucket 0
+    ring.add(35)   # bucket 3, reuses bucket 0's slot
+    ring.add(6)    # bucket 0 is now older than the window: dropped
+    start, counts = ring.window(35)
+    assert start == 10
+    assert counts == [0, 0, 1]
+
+def test_rebuild_replaces_aggregates():
+    stats = MarketplaceStats()
+    stats.record_mint(make_nft('short', 1, 1))
+    stats.rebuild([make_nft('long', 50000, 150), make_nft('long', 30000, 110)])
+
+    snapshot = stats.snapshot(NOW)
+    assert snapshot['total'] == 2
+    assert snapshot['by_type']['short']['count'] == 0
+    assert snapshot['by_type']['long']['avg_minting_price_btc'] == 40000
+    assert snapshot['mint_volume']['hourly']['counts'][-1] == 2
+
+def test_unknown_nft_type_is_ignored():
+    stats = MarketplaceStats()
+    stats.record_mint(make_nft('medium', 1, 1))
+    assert stats.snapshot(NOW)['total'] == 0
@@ -0,0 +1,79 @@
+import json
+import os
+import pytest
+
+from app.services import render_config
+from app.services.render_config import (
+    DEFAULT_RENDER_CONFIG, get_render_config, load_render_config, reset_render_config_cache
+)
+from app.services.gif_service import get_sentiment_band
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "render_config.json"
+    monkeypatch.setenv('RENDER_CONFIG_PATH', str(path))
+    # Check the file on every call so the test doesn't have to sleep
+    monkeypatch.setattr(render_config, 'RELOAD_CHECK_INTERVAL', 0)
+    reset_render_config_cache()
+    yield path
+    reset_render_config_cache()
+
+def write_config(path, values, mtime_ns=None):
+    path.write_text(json.dumps(values))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_missing_file_uses_defaults(config_file):
+    assert get_render_config() == DEFAULT_RENDER_CONFIG
+
+def test_partial_file_is_merged_with_defaults(config_file):
+    write_config(config_file, {'btc_high_threshold': 40000, 'tile_size': 10})
+    config = get_render_config()
+    assert config['btc_high_threshold'] == 40000
+    assert config['tile_size'] == 10
+    assert config['sol_low_threshold'] == DEFAULT_RENDER_CONFIG['sol_low_threshold']
+
+def test_hot_reload_on_file_change(config_file):
+    write_config(config_file, {'sol_high_threshold': 150}, mtime_ns=1_000_000_000)
+    assert get_render_config()['sol_high_threshold'] == 150
+    write_config(config_file, {'sol_high_threshold': 200}, mtime_ns=2_000_000_000)
+    assert get_render_config()['sol_high_threshold'] == 200
+
+def test_reload_is_rate_limited(config_file, monkeypatch):
+    monkeypatch.setattr(render_config, 'RELOAD_CHECK_INTERVAL', 3600)
+    write_config(config_file, {'fps': 12}, mtime_ns=1_000_000_000)
+    assert get_render_config()['fps'] == 12
+    write_config(config_file, {'fps': 24}, mtime_ns=2_000_000_000)
+    assert get_render_config()['fps'] == 12 # Not re-checked yet
+
+def test_invalid_file_keeps_previous_config(config_file):
+    write_config(config_file, {'btc_low_threshold': 30000}, mtime_ns=1_000_000_000)
+    assert get_render_config()['btc_low_threshold'] == 30000
+    write_config(config_file, {'btc_low_threshold': 99999}, mtime_ns=2_000_000_000) # Above high
+    assert get_render_config()['btc_low_threshold'] == 30000
+
+@pytest.mark.parametrize('overrides', [
+    {'unknown_key': 1},
+    {'tile_size': 0},
+    {'fps': 2.5},
+    {'padding': -1},
+    {'sol_low_threshold': 'low'},
+    {'sol_low_threshold': 130, 'sol_high_threshold': 130},
+])
+def test_load_render_config_rejects_invalid_values(tmp_path, overrides):
+    path = tmp_path / "bad.json"
+    write_config(path, overrides)
+    with pytest.raises(ValueError):
+        load_render_config(str(path))
+
+def test_shipped_config_is_valid():
+    # Only validity is checked: the shipped values are meant to be tuned
+    config = load_render_config(render_config.DEFAULT_CONFIG_PATH)
+    assert set(config) == set(DEFAULT_RENDER_CONFIG)
+
+def test_get_sentiment_band_uses_config():
+    config = dict(DEFAULT_RENDER_CONFIG)
+    assert get_sentiment_band({'btc_usd': 37000, 'sol_usd': 100}, config) == ('high', 'low')
+    assert get_sentiment_band({'btc_usd': 35000, 'sol_usd': 120}, config) == ('neutral', 'neutral')
+    config['btc_high_threshold'] = 38000
+    assert get_sentiment_band({'btc_usd': 37000, 'sol_usd': 120}, config) == ('neutral', 'neutral')
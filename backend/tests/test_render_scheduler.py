@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+import pytest
+from PIL import Image
+from unittest.mock import patch
+
+from app.services.gif_service import UPLOADS_DIR, ensure_directories_exist
+from app.services.render_scheduler import (
+    RenderScheduler, RenderRejected, TokenBucket, estimate_render_cost
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def image_factory():
+    ensure_directories_exist()
+    created = []
+
+    def make(name, size):
+        path = os.path.join(UPLOADS_DIR, name)
+        Image.new('RGB', size, color='red').save(path)
+        created.append(path)
+        return path
+
+    yield make
+    for path in created:
+        if os.path.exists(path):
+            os.remove(path)
+
+def test_estimate_render_cost_includes_padding_and_frames():
+    # (10 + 120) * (20 + 120) canvas, 5s at 10fps
+    assert estimate_render_cost(10, 20, 5, 10) == 130 * 140 * 50
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(100, 10, clock)
+    bucket.consume(100)
+    assert bucket.seconds_until(50) == 5.0
+    clock.now = 5.0
+    assert bucket.available() == 50
+    clock.now = 100.0
+    assert bucket.available() == 100 # Capped at capacity
+
+def test_plan_within_budget_is_not_degraded():
+    scheduler = RenderScheduler(max_request_cost=10**9)
+    plan = scheduler.plan(100, 100, 5, 10)
+    assert not plan.degraded
+    assert plan.fps == 10 and plan.scale == 1.0
+
+def test_plan_lowers_fps_before_scaling():
+    cost_at_10fps = estimate_render_cost(100, 100, 5, 10)
+    scheduler = RenderScheduler(max_request_cost=cost_at_10fps * 7 // 10, min_fps=5)
+    plan = scheduler.plan(100, 100, 5, 10)
+    assert plan.degraded
+    assert plan.fps == 7
+    assert plan.scale == 1.0
+    assert plan.cost <= scheduler.max_request_cost
+
+def test_plan_scales_canvas_when_fps_floor_is_not_enough():
+    limit = estimate_render_cost(1000, 1000, 5, 5, scale=0.5)
+    scheduler = RenderScheduler(max_request_cost=limit, min_fps=5)
+    plan = scheduler.plan(1000, 1000, 5, 10)
+    assert plan.fps == 5
+    assert 0.45 < plan.scale <= 0.5
+    assert plan.cost <= limit
+
+def test_plan_rejects_when_degrading_is_not_enough():
+    scheduler = RenderScheduler(max_request_cost=1000)
+    with pytest.raises(RenderRejected) as excinfo:
+        scheduler.plan(1000, 1000, 5, 10)
+    assert excinfo.value.status_code == 413
+
+def test_admit_enforces_client_budget(image_factory):
+    clock = FakeClock()
+    path = image_factory("test_sched_budget.png", (10, 10))
+    cost = estimate_render_cost(10, 10, 1, 5)
+    scheduler = RenderScheduler(client_capacity=cost * 2, client_refill_per_second=cost,
+                                global_capacity=cost * 100, clock=clock)
+
+    scheduler.admit('alice', path, duration_seconds=1, fps=5)
+    scheduler.admit('alice', path, duration_seconds=1, fps=5)
+    with pytest.raises(RenderRejected) as excinfo:
+        scheduler.admit('alice', path, duration_seconds=1, fps=5)
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after == 1
+
+    # Other clients have their own bucket
+    scheduler.admit('bob', path, duration_seconds=1, fps=5)
+    # ...and alice's refills
+    clock.now = 1.0
+    scheduler.admit('alice', path, duration_seconds=1, fps=5)
+
+    stats = scheduler.snapshot()['stats']
+    assert stats['admitted'] == 4
+    assert stats['rejected'] == 1
+
+def test_admit_enforces_global_budget(image_factory):
+    path = image_factory("test_sched_global.png", (10, 10))
+    cost = estimate_render_cost(10, 10, 1, 5)
+    scheduler = RenderScheduler(client_capacity=cost * 10, global_capacity=cost,
+                                global_refill_per_second=1, clock=FakeClock())
+    scheduler.admit('alice', path, duration_seconds=1, fps=5)
+    with pytest.raises(RenderRejected) as excinfo:
+        scheduler.admit('bob', path, duration_seconds=1, fps=5)
+    assert "Server render budget" in excinfo.value.message
+
+def test_admit_rejects_unreadable_image():
+    ensure_directories_exist()
+    path = os.path.join(UPLOADS_DIR, "test_sched_not_image.png")
+    with open(path, "w") as f:
+        f.write("not an image")
+    try:
+        with pytest.raises(RenderRejected) as excinfo:
+            RenderScheduler().admit('alice', path)
+        assert excinfo.value.status_code == 400
+    finally:
+        os.remove(path)
+
+def test_full_client_buckets_are_pruned(image_factory):
+    clock = FakeClock()
+    path = image_factory("test_sched_prune.png", (10, 10))
+    cost = estimate_render_cost(10, 10, 1, 5)
+    scheduler = RenderScheduler(client_capacity=cost * 2, client_refill_per_second=cost, clock=clock)
+
+    for i in range(5):
+        scheduler.admit(f'client{i}', path, duration_seconds=1, fps=5)
+    assert scheduler.snapshot()['client_count'] == 5
+
+    # Once refilled, the buckets are indistinguishable from new ones and are dropped
+    clock.now = 10.0
+    scheduler.admit('late', path, duration_seconds=1, fps=5)
+    state = scheduler.snapshot()
+    assert state['client_count'] == 1
+    assert list(state['clients']) == [scheduler.client_label('late')]
+
+def test_snapshot_caps_client_list(image_factory):
+    path = image_factory("test_sched_cap.png", (10, 10))
+    scheduler = RenderScheduler(clock=FakeClock())
+    with patch('app.services.render_scheduler.MAX_SNAPSHOT_CLIENTS', 3):
+        for i in range(5):
+            scheduler.admit(f'client{i}', path, duration_seconds=1, fps=5)
+        state = scheduler.snapshot()
+    assert state['client_count'] == 5
+    assert len(state['clients']) == 3
+
+def test_weighted_fair_queuing_prefers_small_jobs():
+    scheduler = RenderScheduler(max_request_cost=10**12, max_concurrent=1)
+    big = scheduler.plan(1000, 1000, 5, 10)
+    small = scheduler.plan(10, 10, 5, 10)
+
+    # Occupy the only render slot, then queue a big job before two small ones
+    running = scheduler._enqueue('busy', small)
+    assert running.ready.is_set()
+    big_job = scheduler._enqueue('whale', big)
+    small_jobs = [scheduler._enqueue('minnow', small), scheduler._enqueue('shrimp', small)]
+    assert scheduler.snapshot()['queued'] == 3
+
+    order = []
+    for _ in range(3):
+        scheduler._complete(running)
+        running = next(j for j in [big_job] + small_jobs if j.ready.is_set() and j not in order)
+        order.append(running)
+    assert order == small_jobs + [big_job]
+
+def test_run_renders_with_degraded_plan(image_factory):
+    path = image_factory("test_sched_run.png", (20, 20))
+    limit = estimate_render_cost(20, 20, 1, 5)
+    scheduler = RenderScheduler(max_request_cost=limit, min_fps=5, clock=FakeClock())
+
+    with patch('app.services.render_scheduler.create_gif_from_image', return_value="out.gif") as mock_create:
+        output_path, plan = scheduler.run('alice', path, "test_sched_run", duration_seconds=1, fps=10)
+
+    assert output_path == "out.gif"
+    assert plan.degraded
+    mock_create.assert_called_once_with(path, "test_sched_run", duration_seconds=1, fps=5, scale=1.0)
+    state = scheduler.snapshot()
+    assert state['running'] == 0
+    assert state['stats']['completed'] == 1
+    assert scheduler.client_label('alice') in state['clients']
+    assert 'alice' not in state['clients']
+
+def test_queue_depth_is_enforced_at_enqueue(image_factory):
+    clock = FakeClock()
+    path = image_factory("test_sched_depth.png", (10, 10))
+    scheduler = RenderScheduler(max_concurrent=1, max_queue_depth=1, clock=clock)
+
+    # All three pass admission before any is queued, as concurrent requests would
+    plans = [scheduler.admit(f'c{i}', path, duration_seconds=1, fps=5) for i in range(3)]
+    scheduler._enqueue('c0', plans[0]) # Runs
+    scheduler._enqueue('c1', plans[1]) # Queued
+    with pytest.raises(RenderRejected) as excinfo:
+        scheduler._enqueue('c2', plans[2])
+    assert "queue is full" in excinfo.value.message
+
+    state = scheduler.snapshot()
+    assert (state['running'], state['queued']) == (1, 1)
+    assert state['stats']['admitted'] == 2
+    assert state['stats']['rejected'] == 1
+    # The rejected client was refunded, so its bucket is full again (and pruned)
+    assert scheduler.client_label('c2') not in state['clients']
+    assert state['global_tokens'] == state['global_capacity'] - 2 * plans[0].cost
+
+@pytest.mark.parametrize('render', [{'return_value': None}, {'side_effect': RuntimeError("boom")}])
+def test_failed_render_is_refunded(image_factory, render):
+    path = image_factory("test_sched_refund.png", (10, 10))
+    scheduler = RenderScheduler(clock=FakeClock())
+
+    with patch('app.services.render_scheduler.create_gif_from_image', **render):
+        try:
+            output_path, _ = scheduler.run('alice', path, "x", duration_seconds=1, fps=5)
+            assert output_path is None
+        except RuntimeError:
+            pass
+
+    state = scheduler.snapshot()
+    assert state['running'] == 0
+    assert state['stats']['failed'] == 1
+    assert state['stats']['completed'] == 0
+    assert state['client_count'] == 0 # Refunded to full, then pruned
+    assert state['global_tokens'] == state['global_capacity']
+
+def test_run_limits_concurrency(image_factory):
+    path = image_factory("test_sched_concurrency.png", (10, 10))
+    scheduler = RenderScheduler(max_concurrent=1)
+    active = []
+    peak = []
+    release = threading.Event()
+
+    def fake_render(*args, **kwargs):
+        active.append(1)
+        peak.append(len(active))
+        release.wait(timeout=5)
+        active.pop()
+        return "out.gif"
+
+    with patch('app.services.render_scheduler.create_gif_from_image', side_effect=fake_render):
+        threads = [threading.Thread(target=scheduler.run, args=(f'c{i}', path, "x"))
+                   for i in range(3)]
+        for t in threads:
+            t.start()
+
+        # Hold the first render until the other two are queued behind it
+        deadline = time.monotonic() + 5
+        state = scheduler.snapshot()
+        while (state['running'], state['queued']) != (1, 2) and time.monotonic() < deadline:
+            time.sleep(0.01)
+            state = scheduler.snapshot()
+        assert (state['running'], state['queued']) == (1, 2)
+        assert len(active) == 1
+
+        release.set()
+        for t in threads:
+            t.join(timeout=5)
+
+    assert max(peak) == 1
+    assert scheduler.snapshot()['stats']['completed'] == 3
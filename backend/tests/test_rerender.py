@@ -0,0 +1,185 @@
+import json
+import os
+import pytest
+from PIL import Image
+from unittest.mock import patch
+
+from app.rerender import collect_items, config_hash, plan_rerender, read_checkpoint, rerender_collection
+from app.services.gif_service import (
+    create_gif_from_image, render_metadata_path, ensure_directories_exist,
+    UPLOADS_DIR, GENERATED_GIFS_DIR, RENDER_META_DIR
+)
+from app.services.render_config import DEFAULT_RENDER_CONFIG
+
+NEUTRAL_PRICES = {'btc_usd': 35000, 'sol_usd': 120}
+
+@pytest.fixture
+def collection():
+    """Three rendered test items: test_rerender_0..2."""
+    ensure_directories_exist()
+    stems = [f"test_rerender_{i}" for i in range(3)]
+    items = []
+    for stem in stems:
+        image_path = os.path.join(UPLOADS_DIR, f"{stem}.png")
+        Image.new('RGB', (8, 8), color='red').save(image_path)
+        assert create_gif_from_image(image_path, stem, duration_seconds=1, fps=2, prices=NEUTRAL_PRICES,
+                                     config=DEFAULT_RENDER_CONFIG)
+        items.append((stem, image_path))
+    yield items
+    for stem, image_path in items:
+        for path in (image_path, os.path.join(GENERATED_GIFS_DIR, f"{stem}.gif"), render_metadata_path(stem)):
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_create_gif_writes_render_metadata(collection):
+    stem, image_path = collection[0]
+    with open(render_metadata_path(stem)) as f:
+        meta = json.load(f)
+    assert meta['prices'] == NEUTRAL_PRICES
+    assert meta['band'] == ['neutral', 'neutral']
+    assert meta['fps'] == 2 and meta['duration_seconds'] == 1
+    assert meta['tile_size'] == DEFAULT_RENDER_CONFIG['tile_size']
+    # Sidecars must not land in the publicly served GIF directory
+    assert os.path.dirname(render_metadata_path(stem)) == RENDER_META_DIR
+    assert not os.path.exists(os.path.join(GENERATED_GIFS_DIR, f"{stem}.json"))
+
+def test_collect_items_finds_rendered_uploads(collection):
+    found = collect_items()
+    for item in collection:
+        assert item in found
+
+def test_plan_skips_items_with_unchanged_band(collection):
+    tasks, unchanged, no_metadata = plan_rerender(collection, DEFAULT_RENDER_CONFIG)
+    assert tasks == []
+    assert unchanged == [stem for stem, _ in collection]
+    assert no_metadata == []
+
+def test_plan_rerenders_items_whose_band_changed(collection):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    tasks, unchanged, no_metadata = plan_rerender(collection, config)
+    assert unchanged == []
+    stem, image_path, prices, duration_seconds, fps, scale, task_config = tasks[0]
+    # Original prices and render settings are preserved
+    assert prices == NEUTRAL_PRICES
+    assert (duration_seconds, fps, scale) == (1, 2, 1.0)
+    assert task_config == config
+
+def test_rerender_collection_updates_gifs(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    checkpoint = tmp_path / "checkpoint"
+    report = rerender_collection(collection, config, workers=2, checkpoint_path=str(checkpoint))
+
+    assert report['rendered'] == 3
+    assert report['failed'] == []
+    assert report['frames'] == 3 * 2
+    assert report['items_per_second'] > 0
+    assert not checkpoint.exists() # Removed after a clean run
+    for stem, _ in collection:
+        with open(render_metadata_path(stem)) as f:
+            assert json.load(f)['band'] == ['high', 'neutral']
+
+def test_rerender_collection_resumes_from_checkpoint(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, sol_high_threshold=115, sol_low_threshold=100)
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.write_text(f"config {config_hash(config)}\ntest_rerender_0\ntest_rerender_1\n")
+
+    report = rerender_collection(collection, config, workers=1, checkpoint_path=str(checkpoint), resume=True)
+
+    assert not report['restarted']
+    assert report['resumed'] == 2
+    assert report['rendered'] == 1
+    with open(render_metadata_path("test_rerender_0")) as f:
+        assert json.load(f)['band'] == ['neutral', 'neutral'] # Skipped via checkpoint
+    with open(render_metadata_path("test_rerender_2")) as f:
+        assert json.load(f)['band'] == ['neutral', 'high']
+
+def test_rerender_collection_keeps_checkpoint_on_failure(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    checkpoint = tmp_path / "checkpoint"
+    os.remove(collection[1][1]) # Source image gone: this render fails
+
+    report = rerender_collection(collection, config, workers=1, checkpoint_path=str(checkpoint))
+
+    assert report['failed'] == ["test_rerender_1"]
+    assert read_checkpoint(str(checkpoint)) == (config_hash(config), {"test_rerender_0", "test_rerender_2"})
+
+def test_resume_with_changed_config_starts_over(collection, tmp_path):
+    old_config = dict(DEFAULT_RENDER_CONFIG, sol_high_threshold=125, sol_low_threshold=100)
+    new_config = dict(DEFAULT_RENDER_CONFIG, sol_high_threshold=115, sol_low_threshold=100)
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.write_text(f"config {config_hash(old_config)}\ntest_rerender_0\ntest_rerender_1\n")
+
+    report = rerender_collection(collection, new_config, workers=1, checkpoint_path=str(checkpoint), resume=True)
+
+    assert report['restarted']
+    assert report['resumed'] == 0
+    assert report['rendered'] == 3
+    for stem, _ in collection:
+        with open(render_metadata_path(stem)) as f:
+            assert json.load(f)['band'] == ['neutral', 'high']
+
+def test_dry_run_renders_nothing(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    with patch('app.rerender.ProcessPoolExecutor') as mock_pool:
+        report = rerender_collection(collection, config, checkpoint_path=str(tmp_path / "checkpoint"),
+                                     dry_run=True)
+    mock_pool.assert_not_called()
+    assert report['to_render'] == 3
+    assert report['rendered'] == 0
+
+def _failing_rerender(task):
+    if task[0] == "test_rerender_1":
+        raise RuntimeError("render blew up")
+    return task[0], True, 2, 0.0
+
+def _crashing_rerender(task):
+    os._exit(1) # Kills the worker process: the pool breaks
+
+def test_rerender_collection_records_worker_exceptions(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    with patch('app.rerender._rerender_item', _failing_rerender):
+        report = rerender_collection(collection, config, workers=1, checkpoint_path=str(tmp_path / "checkpoint"))
+    assert report['failed'] == ["test_rerender_1"]
+    assert report['rendered'] == 2
+
+def test_rerender_collection_survives_broken_pool(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    with patch('app.rerender._rerender_item', _crashing_rerender):
+        report = rerender_collection(collection, config, workers=1, checkpoint_path=str(tmp_path / "checkpoint"))
+    assert sorted(report['failed']) == [stem for stem, _ in collection]
+    assert report['rendered'] == 0
+
+def test_items_without_metadata_are_skipped_unless_included(collection, tmp_path):
+    config = dict(DEFAULT_RENDER_CONFIG)
+    legacy_stem = collection[0][0]
+    os.remove(render_metadata_path(legacy_stem)) # Minted before sidecars existed
+    with open(os.path.join(GENERATED_GIFS_DIR, f"{legacy_stem}.gif"), 'rb') as f:
+        legacy_gif = f.read()
+
+    report = rerender_collection(collection, config, workers=1, checkpoint_path=str(tmp_path / "checkpoint"))
+    assert report['no_metadata'] == 1
+    assert report['to_render'] == 0
+    with open(os.path.join(GENERATED_GIFS_DIR, f"{legacy_stem}.gif"), 'rb') as f:
+        assert f.read() == legacy_gif
+    assert not os.path.exists(render_metadata_path(legacy_stem))
+
+    with patch('app.rerender.get_current_mock_prices', return_value={'btc_usd': 37000, 'sol_usd': 120}):
+        report = rerender_collection(collection, config, workers=1, checkpoint_path=str(tmp_path / "checkpoint"),
+                                     include_legacy=True)
+    assert report['no_metadata'] == 0
+    assert report['rendered'] == 1
+    with open(render_metadata_path(legacy_stem)) as f:
+        assert json.load(f)['band'] == ['high', 'neutral']
+
+@pytest.mark.parametrize('sidecar', ['[]', '{"band": ["neutral", "neutral"]}', '{"prices": [1, 2]}',
+                                     '{"prices": {"btc_usd": "lots"}}', '{not json'])
+def test_malformed_metadata_is_treated_as_missing(collection, tmp_path, sidecar):
+    config = dict(DEFAULT_RENDER_CONFIG, btc_high_threshold=34500, btc_low_threshold=34000)
+    with open(render_metadata_path(collection[0][0]), 'w') as f:
+        f.write(sidecar)
+
+    report = rerender_collection(collection, config, workers=1, checkpoint_path=str(tmp_path / "checkpoint"))
+
+    assert report['no_metadata'] == 1
+    assert report['rendered'] == 2
+    assert report['failed'] == []
@@ -0,0 +1,33 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_warm_fork_serves_from_forked_worker():
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'app.warm_fork', '--host', '127.0.0.1', '--port', '0', '--workers', '1'],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        # The parent prints the bound (ephemeral) port once the worker is forked
+        line = process.stdout.readline()
+        match = re.search(r'Warm-fork server on 127\.0\.0\.1:(\d+) with 1 workers', line)
+        assert match, f"Unexpected startup output: {line!r}"
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{match.group(1)}/", timeout=10) as response:
+            assert response.status == 200
+            assert response.read() == b"Backend is running!"
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    assert process.returncode == 0